@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import io
 import logging
+import shutil
+import time
 import zipfile
+import zlib
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List
+from typing import AsyncIterator, List
 
+# libdeflate binding: whole-buffer DEFLATE, noticeably faster than stdlib zlib
+# for one-shot compression of small members.
+import deflate
 from dotenv import load_dotenv
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.responses import FileResponse, StreamingResponse
@@ -21,6 +28,7 @@ from app.services.loader_generator import generate_loader_artifacts
 from app.utils.files import (
     BASE_DIR,
     AGREEMENTS_DIR,
+    EXTRACT_CACHE_SUFFIX,
     OUTPUT_DIR,
     STANDARDS_DIR,
     ensure_dir,
@@ -31,6 +39,134 @@ from app.utils.files import (
 
 logger = logging.getLogger("loader_app")
 
+# Max zip chunks buffered between the compressing thread and the response.
+ZIP_STREAM_QUEUE_MAX = 8
+
+
+class _QueueZipSink(io.RawIOBase):
+    """Writable sink that forwards zip chunks from a worker thread to an asyncio.Queue.
+
+    The sink is non-seekable, so ``zipfile`` writes data descriptors and never
+    needs to rewind; chunks can be sent to the client as soon as they are
+    produced instead of buffering the whole archive in memory.
+    """
+
+    def __init__(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop) -> None:
+        self._queue = queue
+        self._loop = loop
+        self._pos = 0
+        self._aborted = False
+
+    def writable(self) -> bool:
+        return True
+
+    def abort(self) -> None:
+        self._aborted = True
+
+    def write(self, data) -> int:
+        if self._aborted:
+            raise RuntimeError("zip stream consumer is gone")
+        n = len(data)
+        if n:
+            self._pos += n
+            # zipfile hands us immutable bytes most of the time; only copy when
+            # given a mutable buffer (memoryview/bytearray) that may be reused.
+            chunk = data if isinstance(data, bytes) else bytes(data)
+            # Block the compressing thread (not the event loop) until the
+            # consumer has drained enough of the queue.
+            asyncio.run_coroutine_threadsafe(self._queue.put(chunk), self._loop).result()
+        return n
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def _member_compress_type(path: Path) -> int:
+    # XLSX members are already-deflated OOXML containers; re-deflating them
+    # burns CPU for near-zero size reduction, so store them as-is.
+    if path.suffix.lower() == ".xlsx":
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+# libdeflate is non-streaming, so only hand it members that fit comfortably in memory.
+LIBDEFLATE_MAX_BYTES = 2 * 1024 * 1024
+
+
+def _write_libdeflate_member(zf: zipfile.ZipFile, arcname: str, raw: bytes) -> None:
+    """Write ``raw`` as a DEFLATED member compressed in one shot by libdeflate.
+
+    ``zipfile`` has no hook for alternative DEFLATE codecs, so fill in the
+    ZipInfo bookkeeping ourselves. Sizes and CRC are known up front, which
+    also means the member needs no data descriptor on a non-seekable sink.
+    """
+    compressed = deflate.deflate_compress(raw, 6)
+    zinfo = zipfile.ZipInfo(arcname, date_time=time.localtime()[:6])
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    # A bare ZipInfo carries mode 000 on Unix; give members the same default
+    # permissions ZipFile.writestr applies so they extract readable.
+    zinfo.external_attr = 0o600 << 16
+    zinfo.file_size = len(raw)
+    zinfo.compress_size = len(compressed)
+    zinfo.CRC = zlib.crc32(raw)
+    zinfo.header_offset = zf.fp.tell()
+    zf.fp.write(zinfo.FileHeader(zip64=False))
+    zf.fp.write(compressed)
+    zf.start_dir = zf.fp.tell()
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+
+
+# Copy-buffer size for streaming members into the archive.
+ZIP_COPY_BUFFER = 64 * 1024
+
+
+def _write_zip_archive(paths: List[Path], sink: _QueueZipSink) -> None:
+    with zipfile.ZipFile(
+        sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1, allowZip64=True
+    ) as zf:
+        for p in paths:
+            if not p.exists():
+                continue
+            compress_type = _member_compress_type(p)
+            if compress_type == zipfile.ZIP_DEFLATED and p.stat().st_size <= LIBDEFLATE_MAX_BYTES:
+                _write_libdeflate_member(zf, p.name, p.read_bytes())
+                continue
+            # Stream the member through a writer handle; force_zip64 keeps the
+            # non-seekable data-descriptor path valid however large the batch
+            # grows, without needing sizes up front.
+            zinfo = zipfile.ZipInfo.from_file(p, arcname=p.name)
+            zinfo.compress_type = compress_type
+            with zf.open(zinfo, "w", force_zip64=True) as dst, p.open("rb") as src:
+                shutil.copyfileobj(src, dst, length=ZIP_COPY_BUFFER)
+
+
+async def _stream_zip_archive(paths: List[Path]) -> AsyncIterator[bytes]:
+    queue: asyncio.Queue = asyncio.Queue(maxsize=ZIP_STREAM_QUEUE_MAX)
+    sink = _QueueZipSink(queue, asyncio.get_running_loop())
+
+    async def produce() -> None:
+        try:
+            await asyncio.to_thread(_write_zip_archive, paths, sink)
+        finally:
+            await queue.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (chunk := await queue.get()) is not None:
+            yield chunk
+        await producer
+    finally:
+        if not producer.done():
+            # Client went away mid-download: unblock and fail the zip thread.
+            sink.abort()
+            while not producer.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+            producer.exception()
+
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
@@ -97,7 +233,11 @@ async def generate_loader(payload: GenerateLoaderRequest):
     if not standards_batch_dir.exists() or not standards_batch_dir.is_dir():
         raise HTTPException(status_code=404, detail=f"Unknown batch_id: {payload.batch_id}")
 
-    standard_paths = sorted([p for p in standards_batch_dir.iterdir() if p.is_file()])
+    standard_paths = sorted(
+        p
+        for p in standards_batch_dir.iterdir()
+        if p.is_file() and EXTRACT_CACHE_SUFFIX not in p.name
+    )
     if not standard_paths:
         raise HTTPException(status_code=400, detail="No standard files found in the provided batch.")
 
@@ -119,21 +259,24 @@ async def generate_loader(payload: GenerateLoaderRequest):
 
     if len(abs_paths) == 1:
         file_path = abs_paths[0]
-        if not file_path.exists():
-            raise HTTPException(status_code=500, detail="Generated Excel file not found on disk.")
+        try:
+            stat_result = file_path.stat()
+        except OSError as exc:
+            raise HTTPException(status_code=500, detail="Generated Excel file not found on disk.") from exc
+        # Pass the precomputed stat so Starlette skips its own stat call; the
+        # str path keeps it on the plain sendfile-capable code path.
         return FileResponse(
-            file_path,
+            str(file_path),
             media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             filename=file_path.name,
+            stat_result=stat_result,
         )
 
-    # If multiple files, package into a zip for download.
-    zip_buf = io.BytesIO()
-    with zipfile.ZipFile(zip_buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for p in abs_paths:
-            if p.exists():
-                zf.write(p, arcname=p.name)
-    zip_buf.seek(0)
+    # If multiple files, package into a zip for download, streamed as it is
+    # built. The run's JSON artifacts ride along with the workbooks.
+    for rel in (result.loader_json_path, result.meta_json_path):
+        path_obj = BASE_DIR / rel if not Path(rel).is_absolute() else Path(rel)
+        abs_paths.append(path_obj)
     zip_name = f"{payload.agreement_id}_{payload.batch_id}_loader_outputs.zip"
     headers = {"Content-Disposition": f'attachment; filename="{zip_name}"'}
-    return StreamingResponse(zip_buf, media_type="application/zip", headers=headers)
+    return StreamingResponse(_stream_zip_archive(abs_paths), media_type="application/zip", headers=headers)
@@ -1,19 +1,19 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from datetime import datetime, timezone
 import re
-import shutil
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+import orjson
 from fastapi import HTTPException
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
 
 from app.models.schemas import ExcelOutputPlan, GenerateLoaderResponse, LoaderOutput
 from app.services.openai_client import generate_json_object
 from app.services.text_extract import TextExtractionError, extract_text
+from app.services.xlsx_patch import PreparedXlsxTemplate, XlsxPatchError
 from app.utils.files import BASE_DIR, OUTPUT_DIR, create_versioned_output_dir, safe_agreement_base_name
 
 SYSTEM_PROMPT = """You are the DISCOUNT IOT PROCESSING ENGINE — MASTER RULESET.
@@ -80,21 +80,35 @@ def _utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _write_sms_row(ws, row_idx: int, *, rate: float, currency: str, is_discount: bool, highlight: PatternFill) -> None:
-    ws[f"{SMS_CURRENCY_COL}{row_idx}"] = currency
-    ws[f"{SMS_DISCOUNT_COL}{row_idx}"] = 1 if is_discount else 0
-    ws[f"{SMS_RATE_COL}{row_idx}"] = rate
-    ws[f"{SMS_INITIAL_FEE_COL}{row_idx}"] = ""
-    # Highlight rate + charging interval cells to signal updates without altering the interval value.
-    for col in (SMS_RATE_COL, SMS_CHARGING_INTERVAL_COL):
-        cell = ws[f"{col}{row_idx}"]
-        cell.fill = highlight
+def _sms_row_patch(
+    row_idx: int, *, rate: float, currency: str, is_discount: bool
+) -> Tuple[Dict[str, Any], List[str]]:
+    cell_values: Dict[str, Any] = {
+        f"{SMS_CURRENCY_COL}{row_idx}": currency,
+        f"{SMS_DISCOUNT_COL}{row_idx}": 1 if is_discount else 0,
+        f"{SMS_RATE_COL}{row_idx}": rate,
+        f"{SMS_INITIAL_FEE_COL}{row_idx}": None,
+    }
     # Clear off-peak related cells to avoid leaking stale template values.
     for col in ("P", "Q", "R"):
-        ws[f"{col}{row_idx}"] = None
+        cell_values[f"{col}{row_idx}"] = None
+    # Highlight rate + charging interval cells to signal updates without altering the interval value.
+    highlight = [f"{SMS_RATE_COL}{row_idx}", f"{SMS_CHARGING_INTERVAL_COL}{row_idx}"]
+    return cell_values, highlight
 
 
-def _generate_excel_from_template(template_path: Path, dest_path: Path, plan: ExcelOutputPlan) -> None:
+# Every cell the patcher may highlight; the template styles are prepared for
+# these once per request.
+_ALL_HIGHLIGHT_CELLS = [
+    f"{col}{row}"
+    for row in (SMS_MO_ROW, SMS_MT_ROW)
+    for col in (SMS_RATE_COL, SMS_CHARGING_INTERVAL_COL)
+]
+
+
+def _generate_excel_from_template(
+    template: PreparedXlsxTemplate, dest_path: Path, plan: ExcelOutputPlan
+) -> None:
     match = FILENAME_PATTERN.match(plan.filename)
     if not match:
         raise HTTPException(
@@ -116,23 +130,32 @@ def _generate_excel_from_template(template_path: Path, dest_path: Path, plan: Ex
         )
 
     dest_path.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy(template_path, dest_path)
-
-    wb = load_workbook(dest_path)
-    ws = wb.active
-    highlight = PatternFill(fill_type="solid", fgColor="FFFF00")
 
     # Set partner TADIG.
-    ws["C2"] = plan.partner_tadig
+    cell_values: Dict[str, Any] = {"C2": plan.partner_tadig}
+    highlight_cells: List[str] = []
 
     # SMS-MO update (always).
-    _write_sms_row(ws, SMS_MO_ROW, rate=plan.sms_mo_rate, currency=plan.currency, is_discount=plan.is_discount, highlight=highlight)
+    row_values, row_highlight = _sms_row_patch(
+        SMS_MO_ROW, rate=plan.sms_mo_rate, currency=plan.currency, is_discount=plan.is_discount
+    )
+    cell_values.update(row_values)
+    highlight_cells.extend(row_highlight)
 
     # SMS-MT update only when provided (> 0).
     if plan.sms_mt_rate and plan.sms_mt_rate > 0:
-        _write_sms_row(ws, SMS_MT_ROW, rate=plan.sms_mt_rate, currency=plan.currency, is_discount=plan.is_discount, highlight=highlight)
+        row_values, row_highlight = _sms_row_patch(
+            SMS_MT_ROW, rate=plan.sms_mt_rate, currency=plan.currency, is_discount=plan.is_discount
+        )
+        cell_values.update(row_values)
+        highlight_cells.extend(row_highlight)
 
-    wb.save(dest_path)
+    try:
+        template.write(dest_path, cell_values=cell_values, highlight_cells=highlight_cells)
+    except XlsxPatchError as exc:
+        raise HTTPException(
+            status_code=422, detail=f"Standard template could not be patched: {exc}"
+        ) from exc
 
 
 def _truncate(text: str, limit: int) -> Tuple[str, bool]:
@@ -172,13 +195,14 @@ def _truncate_inputs(
     remaining_budget = max(0, MAX_TOTAL_CHARS - len(agreement_text))
     per_standard_budget = max(5_000, remaining_budget // len(normalized_standards))
 
+    # Only slice standards that actually exceed the budget; CPython string
+    # slicing copies, so in-budget texts are reused as-is.
     final_standards: List[Tuple[str, str]] = []
     for filename, text in normalized_standards:
-        text2, trunc2 = _truncate(text, per_standard_budget)
-        meta["truncated"]["standards"][filename] = bool(
-            meta["truncated"]["standards"][filename] or trunc2
-        )
-        final_standards.append((filename, text2))
+        if len(text) > per_standard_budget:
+            meta["truncated"]["standards"][filename] = True
+            text = text[:per_standard_budget]
+        final_standards.append((filename, text))
 
     return agreement_text, final_standards, meta
 
@@ -228,17 +252,20 @@ async def generate_loader_artifacts(
 ) -> GenerateLoaderResponse:
     started_at = _utc_now()
 
+    # Extract all files concurrently in worker threads: parsing is CPU/IO bound
+    # and the underlying libraries release the GIL at C-extension boundaries.
     try:
-        agreement_text = extract_text(agreement_path)
+        extracted = await asyncio.gather(
+            asyncio.to_thread(extract_text, agreement_path),
+            *(asyncio.to_thread(extract_text, p) for p in standard_paths),
+        )
     except TextExtractionError as exc:
         raise HTTPException(status_code=422, detail=str(exc)) from exc
 
-    standards: List[Tuple[str, str]] = []
-    for p in standard_paths:
-        try:
-            standards.append((p.name, extract_text(p)))
-        except TextExtractionError as exc:
-            raise HTTPException(status_code=422, detail=str(exc)) from exc
+    agreement_text = extracted[0]
+    standards: List[Tuple[str, str]] = [
+        (p.name, text) for p, text in zip(standard_paths, extracted[1:])
+    ]
 
     agreement_text, standards, trunc_meta = _truncate_inputs(agreement_text, standards)
 
@@ -298,22 +325,39 @@ async def generate_loader_artifacts(
     meta_json_path = output_dir / "meta.json"
     loader_excel_paths: list[Path] = []
 
-    loader_json_path.write_text(
-        json.dumps(json.loads(raw_json), indent=2, ensure_ascii=False) + "\n",
-        encoding="utf-8",
-    )
+    # The content already passed validation, so serialize the model directly
+    # instead of re-parsing raw_json just to pretty-print it.
+    loader_json_path.write_text(loader.model_dump_json(indent=2) + "\n", encoding="utf-8")
 
     # Build Excel outputs using the first provided standard as the template.
     template_source = standard_paths[0] if standard_paths else None
     if template_source is None:
         raise HTTPException(status_code=400, detail="No standard template available to generate Excel output.")
 
+    # Read and prepare the template once (active sheet + highlight styles),
+    # then patch from memory for every plan.
+    try:
+        template = PreparedXlsxTemplate(
+            template_source.read_bytes(), highlight_cells=_ALL_HIGHLIGHT_CELLS
+        )
+    except XlsxPatchError as exc:
+        raise HTTPException(
+            status_code=422, detail=f"Standard template could not be patched: {exc}"
+        ) from exc
     for plan in loader.excel_outputs:
         dest_filename = plan.filename
         dest_path = output_dir / dest_filename
-        _generate_excel_from_template(template_source, dest_path, plan)
+        _generate_excel_from_template(template, dest_path, plan)
         loader_excel_paths.append(dest_path)
 
+    # All artifact paths live under BASE_DIR; compute the relative forms once
+    # and reuse them for both meta.json and the response.
+    rel_output_dir = str(output_dir.relative_to(BASE_DIR))
+    rel_loader_json = str(loader_json_path.relative_to(BASE_DIR))
+    rel_loader_txt = str(loader_txt_path.relative_to(BASE_DIR)) if loader_txt_path else None
+    rel_meta_json = str(meta_json_path.relative_to(BASE_DIR))
+    rel_loader_excel = [str(p.relative_to(BASE_DIR)) for p in loader_excel_paths]
+
     finished_at = _utc_now()
     meta: Dict[str, Any] = {
         "created_at": finished_at,
@@ -330,27 +374,16 @@ async def generate_loader_artifacts(
         },
         "openai_usage": usage,
         "outputs": {
-            "output_dir": str(output_dir.relative_to(BASE_DIR)),
-            "loader_json": str(loader_json_path.relative_to(BASE_DIR)),
-            "loader_txt": str(loader_txt_path.relative_to(BASE_DIR)) if loader_txt_path else None,
-            "loader_excel": [str(p.relative_to(BASE_DIR)) for p in loader_excel_paths],
-            "meta_json": str(meta_json_path.relative_to(BASE_DIR)),
+            "output_dir": rel_output_dir,
+            "loader_json": rel_loader_json,
+            "loader_txt": rel_loader_txt,
+            "loader_excel": rel_loader_excel,
+            "meta_json": rel_meta_json,
         },
         "excel_plans": [plan.model_dump() for plan in loader.excel_outputs],
     }
-    meta_json_path.write_text(json.dumps(meta, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
-
-    rel_output_dir = str(output_dir.relative_to(BASE_DIR)) if output_dir.is_absolute() else str(output_dir)
-    rel_loader_json = (
-        str(loader_json_path.relative_to(BASE_DIR)) if loader_json_path.is_absolute() else str(loader_json_path)
-    )
-    rel_loader_txt = None
-    rel_meta_json = (
-        str(meta_json_path.relative_to(BASE_DIR)) if meta_json_path.is_absolute() else str(meta_json_path)
-    )
-    rel_loader_excel = [
-        str(p.relative_to(BASE_DIR)) if p.is_absolute() else str(p) for p in loader_excel_paths
-    ]
+    # orjson encodes straight to UTF-8 bytes, skipping the str round-trip.
+    meta_json_path.write_bytes(orjson.dumps(meta, option=orjson.OPT_INDENT_2) + b"\n")
 
     summary = {
         "agreement_name": loader.agreement_name,
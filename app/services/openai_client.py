@@ -3,6 +3,7 @@ from __future__ import annotations
 import os
 from typing import Any, Dict, Optional, Tuple
 
+import httpx
 from fastapi import HTTPException
 from openai import AsyncOpenAI, OpenAIError
 from openai import APITimeoutError
@@ -36,7 +37,14 @@ def get_openai_client() -> AsyncOpenAI:
         raise RuntimeError(
             "OPENAI_API_KEY is not set. Set it in the environment or add it to a .env file."
         )
-    _CLIENT = AsyncOpenAI(api_key=api_key, timeout=_DEFAULT_TIMEOUT)
+    # HTTP/2 multiplexes concurrent completions over one TLS connection, and a
+    # sized keepalive pool avoids re-establishing connections under retries.
+    http_client = httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        timeout=_DEFAULT_TIMEOUT,
+    )
+    _CLIENT = AsyncOpenAI(api_key=api_key, timeout=_DEFAULT_TIMEOUT, http_client=http_client)
     return _CLIENT
 
 
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
+import io
+import os
+import threading
+import uuid
+import zipfile
 from pathlib import Path
+from typing import Optional
 
-from docx import Document
+import pypdfium2 as pdfium
+from lxml import etree
 from openpyxl import load_workbook
-from pypdf import PdfReader
+
+from app.utils.files import EXTRACT_CACHE_SUFFIX
+
+_DOCX_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# PDFium is inherently not thread-safe; every call into it must be serialized.
+_PDFIUM_LOCK = threading.Lock()
 
 
 class TextExtractionError(RuntimeError):
@@ -14,14 +27,60 @@ class TextExtractionError(RuntimeError):
 def extract_text(file_path: Path) -> str:
     suffix = file_path.suffix.lower()
     if suffix == ".txt":
+        # Plain text is a straight read; a sidecar cache would just duplicate it.
         return _extract_txt(file_path)
     if suffix == ".docx":
-        return _extract_docx(file_path)
-    if suffix == ".pdf":
-        return _extract_pdf(file_path)
-    if suffix == ".xlsx":
-        return _extract_xlsx(file_path)
-    raise TextExtractionError(f"Unsupported file type for text extraction: {file_path.suffix}")
+        extractor = _extract_docx
+    elif suffix == ".pdf":
+        extractor = _extract_pdf
+    elif suffix == ".xlsx":
+        extractor = _extract_xlsx
+    else:
+        raise TextExtractionError(f"Unsupported file type for text extraction: {file_path.suffix}")
+
+    # Batches are commonly re-used across /generate-loader calls, so memoize
+    # parsed text in a sidecar file keyed by the source's size and mtime.
+    try:
+        stat = file_path.stat()
+    except OSError:
+        stat = None
+    cache_path = file_path.parent / (file_path.name + EXTRACT_CACHE_SUFFIX)
+    if stat is not None:
+        cached = _read_cached_text(cache_path, stat)
+        if cached is not None:
+            return cached
+
+    text = extractor(file_path)
+    if stat is not None:
+        _write_cached_text(cache_path, stat, text)
+    return text
+
+
+def _cache_key(stat: os.stat_result) -> str:
+    return f"{stat.st_size} {stat.st_mtime_ns}"
+
+
+def _read_cached_text(cache_path: Path, stat: os.stat_result) -> Optional[str]:
+    try:
+        raw = cache_path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    header, sep, text = raw.partition("\n")
+    if not sep or header != _cache_key(stat):
+        return None
+    return text
+
+
+def _write_cached_text(cache_path: Path, stat: os.stat_result, text: str) -> None:
+    # Best-effort: a failed cache write must never fail the extraction. The
+    # unique tmp name keeps concurrent writers of the same file from clobbering
+    # each other before the atomic replace.
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        tmp_path.write_text(f"{_cache_key(stat)}\n{text}", encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
 
 
 def _extract_txt(file_path: Path) -> str:
@@ -32,31 +91,42 @@ def _extract_txt(file_path: Path) -> str:
 
 
 def _extract_docx(file_path: Path) -> str:
+    # Parse word/document.xml directly instead of building python-docx's full
+    # object model; for plain text extraction only the w:t runs matter.
+    parts: list[str] = []
     try:
-        doc = Document(str(file_path))
-    except Exception as exc:  # python-docx raises various exceptions for invalid DOCX
+        with zipfile.ZipFile(file_path) as z, z.open("word/document.xml") as f:
+            for _, para in etree.iterparse(f, tag=_DOCX_NS + "p"):
+                txt = "".join(t.text or "" for t in para.iter(_DOCX_NS + "t")).strip()
+                if txt:
+                    parts.append(txt)
+                para.clear(keep_tail=True)
+    except Exception as exc:  # bad zip or malformed XML
         raise TextExtractionError(f"Failed to read DOCX file: {file_path.name}") from exc
-
-    parts: list[str] = []
-    for para in doc.paragraphs:
-        txt = (para.text or "").strip()
-        if txt:
-            parts.append(txt)
     return "\n".join(parts).strip()
 
 
 def _extract_pdf(file_path: Path) -> str:
-    try:
-        reader = PdfReader(str(file_path))
-    except Exception as exc:
-        raise TextExtractionError(f"Failed to read PDF file: {file_path.name}") from exc
-
-    parts: list[str] = []
-    for page in reader.pages:
-        page_text = page.extract_text() or ""
-        page_text = page_text.strip()
-        if page_text:
-            parts.append(page_text)
+    # pypdfium2 wraps PDFium (C++), much faster than pure-Python parsing, but
+    # PDFium is not thread-safe: hold _PDFIUM_LOCK for the whole document so
+    # the concurrent per-file fan-out never drives it from two threads at once.
+    with _PDFIUM_LOCK:
+        try:
+            pdf = pdfium.PdfDocument(str(file_path))
+        except Exception as exc:
+            raise TextExtractionError(f"Failed to read PDF file: {file_path.name}") from exc
+
+        parts: list[str] = []
+        try:
+            for page in pdf:
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_range().strip()
+                if page_text:
+                    parts.append(page_text)
+                textpage.close()
+                page.close()
+        finally:
+            pdf.close()
     return "\n\n".join(parts).strip()
 
 
@@ -66,12 +136,21 @@ def _extract_xlsx(file_path: Path) -> str:
     except Exception as exc:
         raise TextExtractionError(f"Failed to read XLSX file: {file_path.name}") from exc
 
-    parts: list[str] = []
+    # Write rows straight into a bytes buffer instead of accumulating
+    # per-row lists; avoids one intermediate allocation per row on big sheets.
+    buf = io.BytesIO()
     for sheet in workbook.worksheets:
         for row in sheet.iter_rows(values_only=True):
-            row_values = [str(cell).strip() for cell in row if cell not in (None, "")]
-            if row_values:
-                parts.append(" ".join(row_values))
+            wrote = False
+            for cell in row:
+                if cell in (None, ""):
+                    continue
+                if wrote:
+                    buf.write(b" ")
+                buf.write(str(cell).strip().encode("utf-8"))
+                wrote = True
+            if wrote:
+                buf.write(b"\n")
 
     workbook.close()
-    return "\n".join(parts).strip()
+    return buf.getvalue().decode("utf-8").strip()
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import io
+import re
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+
+class XlsxPatchError(RuntimeError):
+    pass
+
+
+STYLES_MEMBER = "xl/styles.xml"
+_DEFAULT_SHEET_MEMBER = "xl/worksheets/sheet1.xml"
+
+# Yellow solid fill, equivalent to PatternFill(fill_type="solid", fgColor="FFFF00").
+_HIGHLIGHT_FILL_XML = (
+    b'<fill><patternFill patternType="solid">'
+    b'<fgColor rgb="FFFFFF00"/><bgColor indexed="64"/></patternFill></fill>'
+)
+
+_ACTIVE_TAB_RE = re.compile(rb'activeTab="(\d+)"')
+_SHEET_TAG_RE = re.compile(rb"<sheet\b[^>]*/?>")
+_REL_ID_RE = re.compile(rb'r:id="([^"]+)"')
+_FILLS_RE = re.compile(rb'<fills count="(\d+)">')
+_CELLXFS_RE = re.compile(rb'<cellXfs count="(\d+)">(.*?)</cellXfs>', re.DOTALL)
+_XF_RE = re.compile(rb"<xf\b[^>]*?(?:/>|>.*?</xf>)", re.DOTALL)
+_CELL_TOKEN_RE = re.compile(rb"<c\b[^>]*?(?:/>|>.*?</c>)", re.DOTALL)
+_ROW_OPEN_RE = re.compile(rb"<row\b[^>]*?(/?)>")
+_ROW_NUM_RE = re.compile(rb'<row r="(\d+)"')
+_STYLE_ATTR_RE = re.compile(rb' s="(\d+)"')
+_CELL_REF_SPLIT_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+@lru_cache(maxsize=256)
+def _cell_re(ref: bytes) -> re.Pattern[bytes]:
+    return re.compile(rb'<c r="' + ref + rb'"(?:\s[^>]*?)?(?:/>|>.*?</c>)', re.DOTALL)
+
+
+@lru_cache(maxsize=64)
+def _row_re(row: int) -> re.Pattern[bytes]:
+    return re.compile(
+        rb'<row r="' + str(row).encode() + rb'"(?:\s[^>]*?)?(?:/>|>.*?</row>)', re.DOTALL
+    )
+
+
+def _split_ref(ref: str) -> Tuple[str, int]:
+    match = _CELL_REF_SPLIT_RE.match(ref)
+    if not match:
+        raise XlsxPatchError(f"Invalid cell reference: {ref!r}")
+    return match.group(1), int(match.group(2))
+
+
+def _col_index(col: str) -> int:
+    idx = 0
+    for ch in col:
+        idx = idx * 26 + (ord(ch) - ord("A") + 1)
+    return idx
+
+
+def _active_sheet_member(src: zipfile.ZipFile) -> str:
+    """Resolve the zip member of the active worksheet via workbook.xml + rels."""
+    try:
+        workbook_xml = src.read("xl/workbook.xml")
+        rels_xml = src.read("xl/_rels/workbook.xml.rels")
+    except KeyError:
+        return _DEFAULT_SHEET_MEMBER
+
+    sheets = _SHEET_TAG_RE.findall(workbook_xml)
+    if not sheets:
+        raise XlsxPatchError("Template workbook declares no sheets.")
+
+    active = 0
+    active_match = _ACTIVE_TAB_RE.search(workbook_xml)
+    if active_match:
+        active = int(active_match.group(1))
+    if active >= len(sheets):
+        active = 0
+
+    rid_match = _REL_ID_RE.search(sheets[active])
+    if not rid_match:
+        raise XlsxPatchError("Active sheet has no relationship id.")
+
+    rel_re = re.compile(
+        rb'<Relationship\b[^>]*Id="' + re.escape(rid_match.group(1)) + rb'"[^>]*/?>'
+    )
+    rel_match = rel_re.search(rels_xml)
+    if not rel_match:
+        raise XlsxPatchError("Active sheet relationship not found in workbook rels.")
+    target_match = re.search(rb'Target="([^"]+)"', rel_match.group(0))
+    if not target_match:
+        raise XlsxPatchError("Active sheet relationship has no target.")
+
+    target = target_match.group(1).decode()
+    return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+
+
+def _set_style_attr(cell_xml: bytes, style: int) -> bytes:
+    # Only touch the open tag; an inline-string body could contain ' s="..."' text.
+    open_tag, _, rest = cell_xml.partition(b">")
+    replacement = b' s="%d"' % style
+    new_tag, count = _STYLE_ATTR_RE.subn(replacement, open_tag, count=1)
+    if not count:
+        # No s attribute yet: insert one right after the tag name.
+        new_tag = open_tag.replace(b"<c", b"<c" + replacement, 1)
+    return new_tag + b">" + rest
+
+
+def _render_cell(ref: str, value: Any, style: Optional[int]) -> bytes:
+    style_attr = b' s="%d"' % style if style is not None else b""
+    ref_b = ref.encode()
+    if value is None or value == "":
+        return b'<c r="%s"%s/>' % (ref_b, style_attr)
+    if isinstance(value, bool):
+        value = int(value)
+    if isinstance(value, (int, float)):
+        return b'<c r="%s"%s><v>%s</v></c>' % (ref_b, style_attr, repr(value).encode())
+    text = escape(str(value)).encode("utf-8")
+    return b'<c r="%s"%s t="inlineStr"><is><t>%s</t></is></c>' % (ref_b, style_attr, text)
+
+
+def _existing_style(cell_xml: Optional[bytes]) -> int:
+    if cell_xml is None:
+        return 0
+    match = _STYLE_ATTR_RE.search(cell_xml.partition(b">")[0])
+    return int(match.group(1)) if match else 0
+
+
+def _add_highlight_styles(styles_xml: bytes, source_styles: Iterable[int]) -> Tuple[bytes, Dict[int, int]]:
+    """Add a yellow-fill variant of each source cell style; return old->new indices."""
+    fills_match = _FILLS_RE.search(styles_xml)
+    if not fills_match:
+        raise XlsxPatchError("Template styles.xml has no fills table.")
+    cellxfs_match = _CELLXFS_RE.search(styles_xml)
+    if not cellxfs_match:
+        raise XlsxPatchError("Template styles.xml has no cellXfs table.")
+
+    fill_count = int(fills_match.group(1))
+    fill_id = fill_count
+
+    # Index new xfs off the actual element count, not the count attribute, in
+    # case a producer wrote them inconsistently.
+    xfs: List[bytes] = _XF_RE.findall(cellxfs_match.group(2))
+
+    style_map: Dict[int, int] = {}
+    new_xfs: List[bytes] = []
+    for source in sorted(set(source_styles)):
+        if source >= len(xfs):
+            raise XlsxPatchError(f"Cell style {source} not present in cellXfs.")
+        xf = xfs[source]
+        # Derive a copy of the source xf with only the fill swapped, so number
+        # formats, fonts and borders of the patched cells are preserved.
+        xf = re.sub(rb' fillId="\d+"', b"", xf)
+        xf = re.sub(rb' applyFill="\d+"', b"", xf)
+        xf = xf.replace(b"<xf", b'<xf fillId="%d" applyFill="1"' % fill_id, 1)
+        style_map[source] = len(xfs) + len(new_xfs)
+        new_xfs.append(xf)
+
+    fills_end = styles_xml.index(b"</fills>")
+    styles_xml = (
+        styles_xml[:fills_end]
+        + _HIGHLIGHT_FILL_XML
+        + styles_xml[fills_end:]
+    )
+    styles_xml = styles_xml.replace(
+        fills_match.group(0), b'<fills count="%d">' % (fill_count + 1), 1
+    )
+
+    cellxfs_match = _CELLXFS_RE.search(styles_xml)
+    assert cellxfs_match is not None  # still present, only fills changed above
+    new_inner = cellxfs_match.group(2) + b"".join(new_xfs)
+    styles_xml = (
+        styles_xml[: cellxfs_match.start()]
+        + b'<cellXfs count="%d">' % (len(xfs) + len(new_xfs))
+        + new_inner
+        + b"</cellXfs>"
+        + styles_xml[cellxfs_match.end():]
+    )
+    return styles_xml, style_map
+
+
+def _patch_row(
+    row_xml: bytes,
+    ops: List[Tuple[str, str, Any, bool]],
+    style_map: Dict[int, int],
+) -> bytes:
+    open_match = _ROW_OPEN_RE.match(row_xml)
+    if not open_match:
+        raise XlsxPatchError("Malformed row element in sheet XML.")
+    if open_match.group(1):  # self-closing, empty row
+        open_tag = row_xml[: open_match.end() - 2] + b">"
+        cells_src = b""
+    else:
+        open_tag = row_xml[: open_match.end()]
+        cells_src = row_xml[open_match.end() : -len(b"</row>")]
+
+    cells: List[Tuple[int, bytes, bytes]] = []  # (col index, ref, cell xml)
+    for token_match in _CELL_TOKEN_RE.finditer(cells_src):
+        token = token_match.group(0)
+        ref_match = re.search(rb'r="([A-Z]+)(\d+)"', token)
+        if not ref_match:
+            raise XlsxPatchError("Cell without reference in sheet XML.")
+        cells.append((_col_index(ref_match.group(1).decode()), ref_match.group(0)[3:-1], token))
+
+    for col, ref, value, highlighted in ops:
+        ref_b = ref.encode()
+        col_idx = _col_index(col)
+        pos = next((i for i, (c, r, _) in enumerate(cells) if r == ref_b), None)
+        existing = cells[pos][2] if pos is not None else None
+        if highlighted:
+            style: Optional[int] = style_map[_existing_style(existing)]
+        else:
+            style = _existing_style(existing) if existing is not None else None
+
+        if value is _KEEP_VALUE:
+            # Style-only update: leave the cell content untouched.
+            if existing is not None:
+                new_cell = _set_style_attr(existing, style)  # type: ignore[arg-type]
+            else:
+                new_cell = _render_cell(ref, None, style)
+        else:
+            new_cell = _render_cell(ref, value, style)
+
+        if pos is not None:
+            cells[pos] = (col_idx, ref_b, new_cell)
+        else:
+            insert_at = next((i for i, (c, _, _) in enumerate(cells) if c > col_idx), len(cells))
+            cells.insert(insert_at, (col_idx, ref_b, new_cell))
+
+    return open_tag + b"".join(token for _, _, token in cells) + b"</row>"
+
+
+_KEEP_VALUE = object()
+
+
+def _patch_sheet(
+    sheet_xml: bytes,
+    cell_values: Dict[str, Any],
+    highlight_cells: Iterable[str],
+    style_map: Dict[int, int],
+) -> bytes:
+    highlight_set = set(highlight_cells)
+    by_row: Dict[int, List[Tuple[str, str, Any, bool]]] = {}
+    for ref in highlight_set - cell_values.keys():
+        col, row = _split_ref(ref)
+        by_row.setdefault(row, []).append((col, ref, _KEEP_VALUE, True))
+    for ref, value in cell_values.items():
+        col, row = _split_ref(ref)
+        by_row.setdefault(row, []).append((col, ref, value, ref in highlight_set))
+
+    for row_num in sorted(by_row):
+        ops = sorted(by_row[row_num], key=lambda op: _col_index(op[0]))
+        row_match = _row_re(row_num).search(sheet_xml)
+        if row_match:
+            new_row = _patch_row(row_match.group(0), ops, style_map)
+            sheet_xml = sheet_xml[: row_match.start()] + new_row + sheet_xml[row_match.end():]
+            continue
+
+        # Row absent from the template: create it in ascending position.
+        new_row = _patch_row(b'<row r="%d"></row>' % row_num, ops, style_map)
+        insert_at = None
+        for existing_row in _ROW_NUM_RE.finditer(sheet_xml):
+            if int(existing_row.group(1)) > row_num:
+                insert_at = existing_row.start()
+                break
+        if insert_at is None:
+            if b"<sheetData/>" in sheet_xml:
+                sheet_xml = sheet_xml.replace(
+                    b"<sheetData/>", b"<sheetData>" + new_row + b"</sheetData>", 1
+                )
+                continue
+            try:
+                insert_at = sheet_xml.index(b"</sheetData>")
+            except ValueError as exc:
+                raise XlsxPatchError("Template sheet has no sheetData element.") from exc
+        sheet_xml = sheet_xml[:insert_at] + new_row + sheet_xml[insert_at:]
+
+    return sheet_xml
+
+
+def _existing_styles_for(sheet_xml: bytes, refs: Iterable[str]) -> Dict[str, int]:
+    styles: Dict[str, int] = {}
+    for ref in refs:
+        cell_match = _cell_re(ref.encode()).search(sheet_xml)
+        styles[ref] = _existing_style(cell_match.group(0) if cell_match else None)
+    return styles
+
+
+class PreparedXlsxTemplate:
+    """An xlsx template with the per-template patching work done once.
+
+    Resolving the active sheet and deriving the highlight styles in styles.xml
+    only depend on the template, not on the values being written, so callers
+    producing several outputs from one template prepare it once and then write
+    each output with per-plan cell values.
+
+    Patching edits the worksheet XML (and styles.xml for the highlight fill)
+    directly inside the zip container instead of running the workbook through a
+    full openpyxl parse/re-serialize. Only the touched members are rewritten;
+    everything else is copied through verbatim.
+    """
+
+    def __init__(self, template_bytes: bytes, *, highlight_cells: Iterable[str]) -> None:
+        self._template_bytes = template_bytes
+        with zipfile.ZipFile(io.BytesIO(template_bytes)) as src:
+            self._sheet_member = _active_sheet_member(src)
+            try:
+                self._sheet_xml = src.read(self._sheet_member)
+                styles_xml = src.read(STYLES_MEMBER)
+            except KeyError as exc:
+                raise XlsxPatchError(f"Template workbook is missing member: {exc}") from exc
+
+        cell_styles = _existing_styles_for(self._sheet_xml, highlight_cells)
+        self._styles_xml, self._style_map = _add_highlight_styles(
+            styles_xml, cell_styles.values()
+        )
+
+    def write(
+        self,
+        dest_path: Path,
+        *,
+        cell_values: Dict[str, Any],
+        highlight_cells: Iterable[str],
+    ) -> None:
+        """Write one patched copy of the template to dest_path.
+
+        ``cell_values`` maps cell references to new values (None clears the
+        cell); ``highlight_cells`` get the yellow solid fill and must be a
+        subset of the references the template was prepared with.
+        """
+        sheet_xml = _patch_sheet(self._sheet_xml, cell_values, highlight_cells, self._style_map)
+
+        with zipfile.ZipFile(io.BytesIO(self._template_bytes)) as src:
+            with zipfile.ZipFile(dest_path, "w", compression=zipfile.ZIP_DEFLATED) as dst:
+                for item in src.infolist():
+                    if item.filename == self._sheet_member:
+                        dst.writestr(item, sheet_xml)
+                    elif item.filename == STYLES_MEMBER:
+                        dst.writestr(item, self._styles_xml)
+                    else:
+                        dst.writestr(item, src.read(item.filename))
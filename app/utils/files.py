@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import itertools
+import os
 import re
 import uuid
 from pathlib import Path
 from typing import Optional
 
+import aiofiles
 from fastapi import HTTPException, UploadFile
 
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -32,7 +35,14 @@ ALLOWED_EXTENSIONS = {
     ".xlsx",
 }
 MAX_UPLOAD_BYTES = 50 * 1024 * 1024  # 15 MB per file
-CHUNK_SIZE = 1024 * 1024  # 1 MB
+CHUNK_SIZE = 64 * 1024  # 64 KiB, aligned with Starlette's multipart buffer
+
+# Compiled once; re's internal cache is a bounded LRU that can evict under load.
+_UNSAFE_CHARS_RE = re.compile(r"[^A-Za-z0-9._-]+")
+
+# Sidecar files written next to uploads by the text-extraction cache; anything
+# listing upload directories must ignore them.
+EXTRACT_CACHE_SUFFIX = ".extract.cache"
 
 
 def ensure_dir(path: Path) -> None:
@@ -47,7 +57,7 @@ def generate_ulid_like_id() -> str:
 def sanitize_filename(filename: str) -> str:
     name = Path(filename).name
     name = name.replace(" ", "_")
-    name = re.sub(r"[^A-Za-z0-9._-]+", "", name)
+    name = _UNSAFE_CHARS_RE.sub("", name)
     if not name or name in {".", ".."}:
         return f"file_{uuid.uuid4().hex}.bin"
     return name[:180]
@@ -60,7 +70,7 @@ def safe_agreement_base_name(stored_filename: str, agreement_id: str) -> str:
     else:
         original = stored_filename
     stem = Path(original).stem
-    stem = re.sub(r"[^A-Za-z0-9._-]+", "_", stem).strip("._-")
+    stem = _UNSAFE_CHARS_RE.sub("_", stem).strip("._-")
     return stem or "agreement"
 
 
@@ -95,7 +105,9 @@ async def save_multipart_upload(
 
     size = 0
     try:
-        with dest_path.open("wb") as f:
+        # aiofiles delegates writes to a thread pool so concurrent uploads do
+        # not serialize behind each other's disk I/O on the event loop.
+        async with aiofiles.open(dest_path, "wb") as f:
             while True:
                 chunk = await upload_file.read(CHUNK_SIZE)
                 if not chunk:
@@ -106,7 +118,7 @@ async def save_multipart_upload(
                         status_code=413,
                         detail=f"File too large. Max allowed is {max_bytes} bytes.",
                     )
-                f.write(chunk)
+                await f.write(chunk)
     except HTTPException:
         if dest_path.exists():
             dest_path.unlink(missing_ok=True)
@@ -126,16 +138,27 @@ async def save_multipart_upload(
 
 
 def find_file_by_id_prefix(directory: Path, file_id: str) -> Path:
-    matches = list(directory.glob(f"{file_id}__*"))
-    if not matches:
-        raise HTTPException(status_code=404, detail=f"Unknown agreement_id: {file_id}")
-    return matches[0]
+    # The prefix is a fixed literal, so a scandir + startswith pass beats
+    # glob's fnmatch machinery and stops at the first hit.
+    prefix = f"{file_id}__"
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.name.startswith(prefix) and EXTRACT_CACHE_SUFFIX not in entry.name:
+                    return Path(entry.path)
+    except FileNotFoundError:
+        pass
+    raise HTTPException(status_code=404, detail=f"Unknown agreement_id: {file_id}")
 
 
 def create_versioned_output_dir(parent: Path, base_name: str) -> Path:
     ensure_dir(parent)
 
-    candidates = [base_name] + [f"{base_name}_v{i}" for i in range(2, 10_000)]
+    # Lazy candidates: the first attempt usually succeeds, so don't build
+    # thousands of version strings up front.
+    candidates = itertools.chain(
+        [base_name], (f"{base_name}_v{i}" for i in range(2, 10_000))
+    )
     for name in candidates:
         p = parent / name
         try: